@@ -1,5 +1,6 @@
 # app/main.py
 import os
+from typing import List
 from fastapi import FastAPI, File, UploadFile, HTTPException, Header
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -22,13 +23,16 @@ def health():
     return {"status": "ok"}
 
 @app.post("/add-user/{username}")
-async def api_add_user(username: str, file: UploadFile = File(...), authorization: str = Header(None)):
+async def api_add_user(username: str, file: List[UploadFile] = File(...), authorization: str = Header(None)):
+    # aceita uma ou várias partes 'file' no mesmo POST (cadastro completo em uma requisição)
     if authorization:
         if not authorization.lower().startswith("bearer ") or authorization.split(" ", 1)[1] != ADMIN_TOKEN:
             raise HTTPException(status_code=401, detail="Unauthorized")
-    content = await file.read()
     try:
-        saved = save_user_image(username, content)
+        saved = []
+        for f in file:
+            content = await f.read()
+            saved.append(save_user_image(username, content))
         force_reload_cache()
         return JSONResponse(status_code=201, content={"saved": saved})
     except Exception as e:
@@ -4,26 +4,30 @@
 Kiosk SmartLocker Completo (Versão Final Integrada):
 - Interface Tkinter (Layout corrigido para evitar tela preta)
 - Reconhecimento Facial (API)
-- Biometria R307/AS608 (Serial/UART em Thread dedicada)
+- Biometria R307/AS608 (Serial/UART: escuta em thread dedicada, cadastro em ticks do Tk)
 - Banco de dados SQLite (Admins + Mapeamento de Digitais)
 - Controle de Solenoide
-- Teclado Virtual (Onboard)
+- Teclado Virtual (próprio, em Tkinter)
 """
 
 import cv2
+import numpy as np
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import time
 import io
 import requests
-from PIL import Image, ImageTk
 import tkinter as tk
 from tkinter import messagebox
+from tkinter import font as tkfont
+from tkinter import ttk
 import sqlite3
 import bcrypt
-import subprocess
-import shutil
+import hmac
 import os
 import sys
+import select
 import traceback
 
 # --- IMPORTAÇÃO SEGURA DO SERVIÇO DE BIOMETRIA ---
@@ -43,35 +47,62 @@ ADMIN_TOKEN = "b77d74d1a7f4f83fcb134b4d8a09fdcd0a4b4921b739e84de3d6a29e43e1cfb3"
 
 USE_GPIO = True  # True se for usar o pino GPIO para solenoide
 SOLENOID_PIN = 17
+# pino ligado à saída de toque (WAKEUP/TOUCH) do sensor; None = sem IRQ, usa polling.
+# Só defina (ex.: 23) se o fio estiver ligado: um pino solto nunca dispara a IRQ.
+FINGER_IRQ_PIN = None
+# polling sem IRQ: começa em FINGER_POLL_MIN e dobra (até FINGER_POLL_MAX) a cada
+# FINGER_BACKOFF_AFTER leituras seguidas sem dedo; volta ao mínimo quando há dedo
+FINGER_POLL_MIN = 0.1
+FINGER_POLL_MAX = 0.5
+FINGER_BACKOFF_AFTER = 20
 CAPTURE_IMAGES_PER_USER = 5  # fotos por usuário no cadastro
 CAMERA_INDEX = 0  # índice da câmera
 DATABASE_FILE = "smartlocker.db"
 
+# custo do bcrypt: calibrado no primeiro boot para ~BCRYPT_TARGET_SECONDS por hash no hardware atual
+BCRYPT_TARGET_SECONDS = 0.25
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 14
+
+# qualidade JPEG das fotos enviadas à API (padrão do OpenCV é 95; 85 reduz ~40% dos bytes)
+JPEG_QUALITY = 85
+# reconhecimento: a API recorta o rosto e o reduz para 100x100 (IMG_SIZE); enviar menor corta ~4x os bytes.
+# Só a largura é fixada: a altura segue a proporção do frame (câmeras 16:9 não ficam achatadas)
+RECOGNIZE_WIDTH = 320
+RECOGNIZE_JPEG_QUALITY = 80
+
 # se True, chama /train automaticamente após envio bem-sucedido do cadastro
 AUTO_TRAIN_AFTER_UPLOAD = False
 # ------------------------------------
 
-# --------- Verifica disponibilidade do 'onboard' (teclado virtual) ----------
-ONBOARD_CMD = shutil.which("onboard")
-
-def show_keyboard():
-    if ONBOARD_CMD:
-        try:
-            subprocess.Popen([ONBOARD_CMD])
-        except Exception as e:
-            print("Falha ao abrir onboard:", e)
-    else:
-        print("onboard não encontrado. Instale com: sudo apt install onboard")
-
-def hide_keyboard():
-    if ONBOARD_CMD:
-        try:
-            subprocess.Popen(["pkill", "-f", ONBOARD_CMD])
-        except Exception:
-            try:
-                subprocess.Popen(["pkill", "onboard"])
-            except Exception:
-                pass
+# Status exibidos no label de resultado: (texto, cor)
+STATUS_BIO_ONLINE = ("Biometria: Online", "cyan")
+STATUS_BIO_OFF = ("Biometria: Off", "gray")
+STATUS_ENROLL_ERROR = ("Erro cadastro", "red")
+STATUS_ANALYZING = ("Analisando...", "yellow")
+STATUS_CONN_ERROR = ("Erro de Conexão", "red")
+STATUS_UNAUTHORIZED = ("Não Autorizado", "red")
+STATUS_SERVER_ERROR = ("Erro Servidor", "red")
+STATUS_DATA_ERROR = ("Erro Dados", "red")
+STATUS_NOT_RECOGNIZED = ("Não reconhecido", "red")
+STATUS_FATAL = ("Erro Fatal", "red")
+
+# avisos rápidos (toast): duração em ms e cor de fundo
+TOAST_MS = 1500
+TOAST_ERROR_MS = 3000
+TOAST_OK = "green"
+TOAST_WARN = "#C77700"
+TOAST_ERROR = "#B00020"
+
+# --------- Teclado virtual (Toplevel próprio, construído uma vez) ----------
+# camadas do teclado: mesmas linhas/quantidade de teclas em todas (a tecla i só troca o rótulo).
+# A maiúscula (⇧) é derivada com str.upper(); "áé" cobre os acentos do português.
+KBD_LAYERS = {
+    "abc": ("1234567890", "qwertyuiop", "asdfghjkl", "zxcvbnm.-_@"),
+    "áé": ("áàâãéêíóôõ", "úüçñäëïöèì", "òùîûýÿåøæ", "´`^~¨'\",;:?"),
+    "#+": ("!@#$%&*()=", "+-_/\\|?<>^", "[]{}~`';:", "\",.§°ºª€£¥¢"),
+}
+KBD_ROWS = KBD_LAYERS["abc"]
 
 # ---------------- GPIO (opcional) ----------------
 if USE_GPIO:
@@ -89,86 +120,224 @@ else:
 
 # ----------------- Banco de Dados (SQLite) -----------------
 
+# Cache em memória da tabela 'fingerprints' (finger_id -> username).
+# Só muda no cadastro de digital, então o loop da biometria não precisa ir ao banco.
+_FINGER_CACHE = {}
+_FINGER_LOCK = threading.Lock()
+
+# Cache em memória da tabela 'admins' (username -> (password_hash, must_reset)).
+# São poucos admins: o login não vai ao banco; change_admin_password grava nos dois.
+_ADMIN_CACHE = {}
+_ADMIN_LOCK = threading.Lock()
+
+# rounds do bcrypt em uso (lido/calibrado na primeira vez que um hash é gerado)
+_bcrypt_rounds = None
+
+# senha do admin padrão: não é hasheada no boot; vale só até a primeira troca (must_reset=1)
+DEFAULT_ADMIN_USER = "admin"
+DEFAULT_ADMIN_PASSWORD = "admin123"
+
+def _calibrate_bcrypt_rounds():
+    """Mede o hash no custo mínimo e escolhe os rounds que ficam perto do tempo alvo."""
+    start = time.perf_counter()
+    bcrypt.hashpw(b"calibracao", bcrypt.gensalt(rounds=BCRYPT_MIN_ROUNDS))
+    elapsed = time.perf_counter() - start
+    rounds = BCRYPT_MIN_ROUNDS
+    # cada round a mais dobra o custo
+    while rounds < BCRYPT_MAX_ROUNDS and elapsed * 2 <= BCRYPT_TARGET_SECONDS:
+        elapsed *= 2
+        rounds += 1
+    return rounds
+
+# incrementar quando o schema mudar (gravado em PRAGMA user_version)
+_DB_SCHEMA_VERSION = 2
+
+_DB_SCHEMA = """
+-- Tabela de Administradores
+-- must_reset=1: senha padrão ainda em uso (password_hash vazio até a primeira troca)
+CREATE TABLE IF NOT EXISTS admins (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    password_hash BLOB NOT NULL,
+    must_reset INTEGER NOT NULL DEFAULT 0
+);
+
+-- --- NOVA TABELA: BIOMETRIA ---
+-- Vincula o ID numérico do sensor (ex: 5) ao nome do usuário (ex: "Joao")
+-- template: cópia do modelo gravado no sensor (get_fpdata), para regravar o sensor
+CREATE TABLE IF NOT EXISTS fingerprints (
+    finger_id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    template BLOB
+);
+
+-- Configurações persistentes (ex.: rounds do bcrypt calibrados)
+CREATE TABLE IF NOT EXISTS config (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
 def init_db(db_file=DATABASE_FILE):
     """Cria banco e tabela de admins, e cria um admin padrão se não existir."""
-    conn = sqlite3.connect(db_file)
-    cur = conn.cursor()
-    
-    # Tabela de Administradores
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS admins (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        password_hash BLOB NOT NULL
-    )
-    """)
-    
-    # --- NOVA TABELA: BIOMETRIA ---
-    # Vincula o ID numérico do sensor (ex: 5) ao nome do usuário (ex: "Joao")
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS fingerprints (
-        finger_id INTEGER PRIMARY KEY,
-        username TEXT NOT NULL
-    )
-    """)
-
-    conn.commit()
-
-    # verifica se já existe algum admin
-    cur.execute("SELECT COUNT(*) FROM admins")
-    row = cur.fetchone()
-    if row and row[0] == 0:
-        # criar admin padrão: admin / admin123
-        default_user = "admin"
-        default_pw = "admin123".encode("utf-8")
-        hashed = bcrypt.hashpw(default_pw, bcrypt.gensalt())
-        try:
-            cur.execute("INSERT INTO admins (username, password_hash) VALUES (?, ?)",
-                        (default_user, hashed))
-            conn.commit()
-            print("Admin padrão criado: usuario='admin' senha='admin123'")
-        except Exception as e:
-            print("Falha ao criar admin padrão:", e)
-    conn.close()
-
-def check_admin_login(username, password, db_file=DATABASE_FILE):
-    conn = sqlite3.connect(db_file)
-    cur = conn.cursor()
-    cur.execute("SELECT password_hash FROM admins WHERE username = ?", (username,))
-    row = cur.fetchone()
-    conn.close()
+    # isolation_level=None: o módulo sqlite3 não abre/fecha transações sozinho (no modo padrão
+    # o DDL ficaria fora delas); BEGIN/COMMIT explícitos deixam tudo, DDL e migrações
+    # incluídos, num único commit (fsync) por boot
+    conn = sqlite3.connect(db_file, isolation_level=None)
+    try:
+        cur = conn.cursor()
+        cur.execute("BEGIN")
+
+        # caminho rápido: com o schema na versão atual o DDL é pulado
+        cur.execute("PRAGMA user_version")
+        if cur.fetchone()[0] < _DB_SCHEMA_VERSION:
+            # execute() um a um: executescript() faria COMMIT antes e rodaria o DDL em autocommit
+            for stmt in _DB_SCHEMA.split(";"):
+                if stmt.strip():
+                    cur.execute(stmt)
+            # bancos criados antes da coluna must_reset
+            cols = {r[1] for r in cur.execute("PRAGMA table_info(admins)")}
+            if "must_reset" not in cols:
+                cur.execute("ALTER TABLE admins ADD COLUMN must_reset INTEGER NOT NULL DEFAULT 0")
+            # bancos criados antes da cópia dos templates no host
+            cols = {r[1] for r in cur.execute("PRAGMA table_info(fingerprints)")}
+            if "template" not in cols:
+                cur.execute("ALTER TABLE fingerprints ADD COLUMN template BLOB")
+            cur.execute(f"PRAGMA user_version = {_DB_SCHEMA_VERSION}")
+
+        # carrega o mapeamento de digitais para memória (consultado a cada leitura do sensor)
+        cur.execute("SELECT finger_id, username FROM fingerprints")
+        with _FINGER_LOCK:
+            _FINGER_CACHE.clear()
+            _FINGER_CACHE.update(cur.fetchall())
+
+        # verifica se já existe algum admin
+        cur.execute("SELECT 1 FROM admins LIMIT 1")
+        if not cur.fetchone():
+            # criar admin padrão sem bcrypt no boot: a senha padrão é conferida
+            # diretamente até o primeiro login obrigar a troca
+            try:
+                cur.execute("INSERT INTO admins (username, password_hash, must_reset) VALUES (?, ?, 1)",
+                            (DEFAULT_ADMIN_USER, b""))
+                print(f"Admin padrão criado: usuario='{DEFAULT_ADMIN_USER}' senha='{DEFAULT_ADMIN_PASSWORD}'")
+            except Exception as e:
+                print("Falha ao criar admin padrão:", e)
+
+        cur.execute("SELECT username, password_hash, must_reset FROM admins")
+        with _ADMIN_LOCK:
+            _ADMIN_CACHE.clear()
+            _ADMIN_CACHE.update((u, (h, bool(r))) for u, h, r in cur.fetchall())
+        cur.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+# --- Conexões reaproveitadas (uma por thread) ---
+# Abrir/fechar o SQLite a cada consulta custa várias syscalls no cartão SD;
+# cada thread mantém sua própria conexão aberta (sqlite3 não compartilha entre threads).
+_tls = threading.local()
+
+# Consultas fixas: o cache de statements do sqlite3 reaproveita o plano compilado
+SQL_SET_ADMIN_HASH = "UPDATE admins SET password_hash = ?, must_reset = 0 WHERE username = ?"
+SQL_GET_CONFIG = "SELECT value FROM config WHERE key = ?"
+SQL_SET_CONFIG = "INSERT OR REPLACE INTO config (key, value) VALUES (?, ?)"
+SQL_SAVE_FINGER = "INSERT OR REPLACE INTO fingerprints (finger_id, username, template) VALUES (?, ?, ?)"
+SQL_GET_FINGER_TEMPLATES = "SELECT finger_id, template FROM fingerprints"
+SQL_DELETE_FINGER = "DELETE FROM fingerprints WHERE finger_id = ?"
+
+def _get_conn(db_file=DATABASE_FILE):
+    """Retorna a conexão da thread atual para db_file, abrindo-a na primeira chamada."""
+    conns = getattr(_tls, "conns", None)
+    if conns is None:
+        conns = _tls.conns = {}
+    conn = conns.get(db_file)
+    if conn is None:
+        conn = sqlite3.connect(db_file)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conns[db_file] = conn
+    return conn
+
+def _get_bcrypt_rounds(db_file=DATABASE_FILE):
+    """Rounds do bcrypt para novos hashes; calibra e persiste na primeira chamada."""
+    global _bcrypt_rounds
+    if _bcrypt_rounds is None:
+        conn = _get_conn(db_file)
+        row = conn.execute(SQL_GET_CONFIG, ("bcrypt_rounds",)).fetchone()
+        if row:
+            rounds = int(row[0])
+        else:
+            rounds = _calibrate_bcrypt_rounds()
+            with conn:
+                conn.execute(SQL_SET_CONFIG, ("bcrypt_rounds", str(rounds)))
+            print(f"bcrypt calibrado: rounds={rounds}")
+        _bcrypt_rounds = rounds
+    return _bcrypt_rounds
+
+def check_admin_login(username, password):
+    """Confere a senha contra o cache em memória (carregado em init_db)."""
+    row = _ADMIN_CACHE.get(username)
     if not row:
         return False
-    stored = row[0]
+    stored, must_reset = row
+    if must_reset:
+        # admin padrão ainda sem hash: comparação em tempo constante com a senha padrão
+        return hmac.compare_digest(password.encode("utf-8"), DEFAULT_ADMIN_PASSWORD.encode("utf-8"))
     try:
         return bcrypt.checkpw(password.encode("utf-8"), stored)
     except Exception as e:
         print("Erro na verificação do bcrypt:", e)
         return False
 
+def admin_must_reset(username):
+    """True se o admin ainda usa a senha padrão e precisa trocá-la."""
+    row = _ADMIN_CACHE.get(username)
+    return bool(row and row[1])
+
 def change_admin_password(username, new_password, db_file=DATABASE_FILE):
-    conn = sqlite3.connect(db_file)
-    cur = conn.cursor()
-    hashed = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt())
-    cur.execute("UPDATE admins SET password_hash = ? WHERE username = ?", (hashed, username))
-    conn.commit()
-    conn.close()
+    hashed = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt(rounds=_get_bcrypt_rounds(db_file)))
+    conn = _get_conn(db_file)
+    with _ADMIN_LOCK:
+        with conn:
+            conn.execute(SQL_SET_ADMIN_HASH, (hashed, username))
+        _ADMIN_CACHE[username] = (hashed, False)
 
 # --- Helpers DB Biometria ---
-def save_finger_map(finger_id, username, db_file=DATABASE_FILE):
-    conn = sqlite3.connect(db_file)
-    cur = conn.cursor()
-    cur.execute("INSERT OR REPLACE INTO fingerprints (finger_id, username) VALUES (?, ?)", (finger_id, username))
-    conn.commit()
-    conn.close()
-
-def get_user_by_finger(finger_id, db_file=DATABASE_FILE):
-    conn = sqlite3.connect(db_file)
-    cur = conn.cursor()
-    cur.execute("SELECT username FROM fingerprints WHERE finger_id = ?", (finger_id,))
-    row = cur.fetchone()
-    conn.close()
-    return row[0] if row else "Desconhecido"
+def save_finger_map(finger_id, username, template=None, db_file=DATABASE_FILE):
+    conn = _get_conn(db_file)
+    with _FINGER_LOCK:
+        with conn:
+            conn.execute(SQL_SAVE_FINGER, (finger_id, username, template))
+        _FINGER_CACHE[finger_id] = username
+
+def get_finger_templates(db_file=DATABASE_FILE):
+    """finger_id -> template salvo no host (None se não houver cópia)."""
+    return dict(_get_conn(db_file).execute(SQL_GET_FINGER_TEMPLATES))
+
+def delete_finger_map(finger_id, db_file=DATABASE_FILE):
+    conn = _get_conn(db_file)
+    with _FINGER_LOCK:
+        with conn:
+            conn.execute(SQL_DELETE_FINGER, (finger_id,))
+        _FINGER_CACHE.pop(finger_id, None)
+
+def get_user_by_finger(finger_id):
+    """Consulta o cache em memória (carregado em init_db, atualizado em save_finger_map)."""
+    return _FINGER_CACHE.get(finger_id, "Desconhecido")
+
+# --- Imagem ---
+_JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY, cv2.IMWRITE_JPEG_OPTIMIZE, 1]
+_RECOGNIZE_JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, RECOGNIZE_JPEG_QUALITY, cv2.IMWRITE_JPEG_OPTIMIZE, 1]
+
+def encode_jpeg(frame, params=_JPEG_PARAMS):
+    """Codifica um frame BGR em JPEG (CPU pura: chamar fora da thread do Tk)."""
+    ok, buf = cv2.imencode('.jpg', frame, params)
+    if not ok:
+        raise RuntimeError("falha ao codificar JPEG")
+    return buf.tobytes()
 
 # inicializa DB na primeira execução
 init_db()
@@ -182,33 +351,100 @@ class KioskApp:
         # estado de autenticação admin
         self.admin_authenticated = False
         self.admin_user = None
+        # login com a senha padrão: a sessão só vale depois da troca de senha
+        self._pending_reset = False
 
         # --- CONTROLE DE BIOMETRIA ---
         # Inicializa como None e carrega depois para não travar a tela
         self.finger_service = None 
         self.is_enrolling_finger = False 
         self.biometrics_ready = False
+        # último status pedido para o label de resultado (aplicado por _apply_status)
+        self._status = ("Resultado: —", "white")
+        # IRQ de toque do sensor: a callback do GPIO escreve no pipe de toque
+        self._finger_irq = False
+        # O loop de escuta bloqueia em select() sobre os dois pipes: acorda no toque
+        # ou no encerramento (quit_app), sem girar em sleep
+        self._touch_r, self._touch_w = os.pipe()
+        self._shutdown_r, self._shutdown_w = os.pipe()
+        for fd in (self._touch_r, self._touch_w):
+            os.set_blocking(fd, False)
         # -----------------------------
 
-        # inicializa câmera
-        self.cap = cv2.VideoCapture(CAMERA_INDEX)
+        # inicializa câmera (V4L2 direto no Linux; senão o backend padrão do OpenCV)
+        self.cap = cv2.VideoCapture(CAMERA_INDEX, cv2.CAP_V4L2)
         # tentativas para garantir câmera
+        if not self.cap.isOpened():
+            self.cap = cv2.VideoCapture(CAMERA_INDEX)
         if not self.cap.isOpened():
             print("Atenção: câmera não abriu no índice", CAMERA_INDEX)
 
         # tenta configurar resolução básica
         try:
+            # MJPG antes da resolução: a webcam entrega JPEG (libjpeg-turbo decodifica)
+            # em vez de YUYV convertido para BGR em software, e usa menos banda USB
+            mjpg = cv2.VideoWriter_fourcc(*"MJPG")
+            self.cap.set(cv2.CAP_PROP_FOURCC, mjpg)
+            if int(self.cap.get(cv2.CAP_PROP_FOURCC)) != mjpg:
+                print("Câmera não aceitou MJPG; usando o formato padrão.")
             self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            # buffer de 1 frame: descarta quadros antigos em vez de acumular atraso
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         except Exception:
             pass
 
-        self.captured_images = []  # lista de bytes das imagens capturadas (cadastro)
+        # último frame lido pela thread de captura (slot único)
+        self._frame_lock = threading.Lock()
+        self.latest_frame = None
+        # sinalizado pela thread de captura quando chega um frame novo
+        self._new_frame = threading.Event()
+
+        # buffers do preview, reaproveitados entre frames (realocados só se o tamanho mudar)
+        self._preview_size = None
+        self._bgr_buf = None
+        self._ppm_buf = None
+        self._ppm_pixels = None
+        self._tk_img = None
+        # preview suspenso enquanto há janela modal visível (conta janelas abertas)
+        self._preview_paused = 0
+
+        # fotos do cadastro: buffers pré-alocados reaproveitados entre cadastros
+        # (só os primeiros _capture_count slots são válidos)
+        self._capture_pool = [bytearray() for _ in range(CAPTURE_IMAGES_PER_USER)]
+        self._capture_count = 0
+
+        # sessão HTTP compartilhada: keep-alive e pool de conexões (evita novo TCP+TLS a cada chamada)
+        self.http = requests.Session()
+        self.http.headers.update({"Authorization": f"Bearer {ADMIN_TOKEN}"})
+
+        # verificação de login em andamento (Entrar/Cancelar desabilitados)
+        self._login_pending = False
+        # toast visível no momento (None = nenhum)
+        self._toast = None
+
+        # pool limitado para as tarefas disparadas por botões (HTTP, JPEG, bcrypt):
+        # reaproveita threads e evita abrir uma nova a cada clique
+        self.pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="kiosk")
+        # verificação de login numa fila própria: um bcrypt por vez, sem disputar com HTTP/solenoide
+        self._auth_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="auth")
+        # solenoide numa fila própria: um /train ou /add-user lento no pool não atrasa a abertura,
+        # e um worker só evita pulsos sobrepostos
+        self._lock_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="locker")
         
         # Chama setup_ui ANTES de rodar processos pesados
         self.setup_ui()
+        # janelas modais construídas uma vez; abrir de novo é só deiconify()
+        self._build_login_window()
+        self._build_change_pw_window()
+        self._kbd = self._build_keyboard()
         
         self.running = True
+
+        # --- Captura da câmera em thread dedicada ---
+        # cap.read() bloqueia até o próximo frame; fora do loop do Tk a UI não trava
+        self._capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._capture_thread.start()
         self.update_frame()
 
         # --- Inicia Biometria em Background ---
@@ -222,22 +458,135 @@ class KioskApp:
             # Tenta instanciar o serviço
             service = FingerprintService()
             if service.available:
+                self._sync_sensor_with_db(service)
                 self.finger_service = service
                 self.biometrics_ready = True
                 print("[System] Biometria conectada!")
                 
                 # Atualiza UI de forma segura (Thread safe)
-                self.root.after(0, lambda: self.recognize_result.config(text="Biometria: Online", fg="cyan"))
+                self._set_status(*STATUS_BIO_ONLINE)
                 
+                # Usa a IRQ de toque se o pino estiver ligado; senão cai no polling
+                self._finger_irq = self._setup_finger_irq()
+
                 # Inicia o loop de escuta contínua
                 self.finger_listen_loop()
             else:
                 print("[System] Sensor biométrico não respondeu.")
-                self.root.after(0, lambda: self.recognize_result.config(text="Biometria: Off", fg="gray"))
+                self._set_status(*STATUS_BIO_OFF)
         except Exception as e:
             print(f"[System] Erro ao iniciar biometria: {e}")
 
+    def _setup_finger_irq(self):
+        """Registra a detecção de toque via GPIO. Retorna False se não for possível."""
+        if not GPIO_AVAILABLE or FINGER_IRQ_PIN is None:
+            return False
+        try:
+            GPIO.setup(FINGER_IRQ_PIN, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+            GPIO.add_event_detect(FINGER_IRQ_PIN, GPIO.RISING, callback=self._on_finger_touch, bouncetime=50)
+            print(f"[Biometria] IRQ de toque ativa no GPIO {FINGER_IRQ_PIN}.")
+            return True
+        except Exception as e:
+            print(f"[Biometria] IRQ indisponível, usando polling: {e}")
+            return False
+
+    def _on_finger_touch(self, channel):
+        """Callback do GPIO (thread do RPi.GPIO): apenas acorda o loop de escuta"""
+        try:
+            os.write(self._touch_w, b"t")
+        except BlockingIOError:
+            pass  # pipe cheio: já há toque pendente
+
+    def _drain_touch(self):
+        """Descarta toques pendentes no pipe"""
+        try:
+            while os.read(self._touch_r, 64):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _wait_biometrics(self, timeout, touch=False):
+        """
+        Espera até `timeout` segundos, retornando antes se o app for encerrado.
+        Com touch=True também acorda no toque do sensor e retorna True nesse caso.
+        """
+        fds = [self._shutdown_r]
+        if touch:
+            fds.append(self._touch_r)
+        ready, _, _ = select.select(fds, [], [], timeout)
+        if self._touch_r in ready and self._shutdown_r not in ready:
+            self._drain_touch()
+            return True
+        return False
+
+    def _ui(self, func, *args):
+        """Agenda func(*args) na thread do Tk (widgets/toasts só podem ser usados nela)"""
+        self.root.after(0, func, *args)
+
+    def _set_status(self, text, fg):
+        """Atualiza o label de resultado a partir de qualquer thread"""
+        # uma atribuição só (atômica) + método já vinculado: nenhuma closure nova por evento
+        self._status = (text, fg)
+        self.root.after(0, self._apply_status)
+
+    def _apply_status(self):
+        text, fg = self._status
+        self.recognize_result.config(text=text, fg=fg)
+
+    def toast(self, text, ms=TOAST_MS, color=TOAST_OK):
+        """
+        Aviso sem borda no topo da janela que some sozinho após `ms`.
+        Ao contrário do messagebox, não abre um event loop aninhado nem exige toque para fechar.
+        """
+        # um aviso por vez: o novo substitui o anterior
+        if self._toast is not None:
+            self._toast.destroy()
+        top = tk.Toplevel(self.root)
+        top.overrideredirect(True)
+        top.attributes("-topmost", True)
+        tk.Label(top, text=text, font=self.font_btn, bg=color, fg="white",
+                 padx=20, pady=12, wraplength=max(self.root.winfo_width() - 80, 300)).pack()
+        top.update_idletasks()
+        # centralizado no topo da janela principal
+        x = self.root.winfo_rootx() + (self.root.winfo_width() - top.winfo_reqwidth()) // 2
+        y = self.root.winfo_rooty() + 30
+        top.geometry(f"+{x}+{y}")
+        self._toast = top
+        self.root.after(ms, self._close_toast, top)
+
+    def _close_toast(self, top):
+        if self._toast is top:
+            self._toast = None
+        top.destroy()
+
+    def _init_fonts(self):
+        """
+        Fontes nomeadas compartilhadas por todos os widgets: a tupla ("Helvetica", 14)
+        seria interpretada (e a fonte resolvida no X) de novo em cada widget criado.
+        Precisa de um Tk já criado, por isso não fica no topo do módulo.
+        """
+        self.font_heading = tkfont.Font(family="Helvetica", size=20, weight="bold")
+        self.font_title = tkfont.Font(family="Helvetica", size=18, weight="bold")
+        self.font_btn = tkfont.Font(family="Helvetica", size=14) # Ajustei fonte para caber melhor
+        self.font_small = tkfont.Font(family="Helvetica", size=12)
+        self._init_styles()
+
+    def _init_styles(self):
+        """Estilo ttk único das janelas de login/senha (tema e cores centralizados aqui)"""
+        style = ttk.Style(self.root)
+        # 'clam' aceita cores customizadas e é desenhado pelo próprio ttk (mais leve que tk.Button)
+        style.theme_use("clam")
+        style.configure("Kiosk.TFrame", background="#222")
+        style.configure("Kiosk.TEntry", padding=6)
+        style.configure("Kiosk.TButton", font=self.font_btn, padding=10,
+                        foreground="white", background="#007ACC")
+        style.map("Kiosk.TButton", background=[("active", "#1A8FE0")])
+        style.configure("Cancel.Kiosk.TButton", background="#888")
+        style.map("Cancel.Kiosk.TButton", background=[("active", "#999")])
+        style.configure("Small.Kiosk.TButton", font=self.font_small, padding=4)
+
     def setup_ui(self):
+        self._init_fonts()
         self.root.title("SmartLocker Kiosk")
         self.root.configure(bg="black")
         
@@ -260,15 +609,16 @@ class KioskApp:
         self.canvas = tk.Label(preview_frame, bg="black")
         self.canvas.pack(fill=tk.BOTH, expand=True)
 
-        font_title = ("Helvetica", 18, "bold")
-        font_btn = ("Helvetica", 14) # Ajustei fonte para caber melhor
-        font_small = ("Helvetica", 12)
+        font_title = self.font_title
+        font_btn = self.font_btn
+        font_small = self.font_small
 
         # Cadastro
         tk.Label(controls_frame, text="Cadastro de Usuário", bg="#222", fg="white", font=font_title).pack(pady=(6,4))
         self.name_entry = tk.Entry(controls_frame, font=font_btn, justify="center")
         self.name_entry.pack(pady=(0,8), ipadx=6, ipady=6, fill=tk.X)
-        self.name_entry.bind("<FocusIn>", lambda e: show_keyboard())
+        self.name_entry.bind("<FocusIn>", self._kbd_focus)
+        self.name_entry.bind("<ButtonRelease-1>", self._kbd_focus)
 
         btn_frame = tk.Frame(controls_frame, bg="#222")
         btn_frame.pack(pady=(4,12), fill=tk.X)
@@ -328,23 +678,44 @@ class KioskApp:
         self.fullscreen = not self.fullscreen
         self.root.attributes("-fullscreen", self.fullscreen)
 
+    def _capture_loop(self):
+        """Lê a câmera continuamente e guarda só o frame mais recente"""
+        while self.running:
+            try:
+                ret, frame = self.cap.read()
+            except Exception:
+                ret = False
+                frame = None
+
+            if ret and frame is not None:
+                with self._frame_lock:
+                    self.latest_frame = frame
+                self._new_frame.set()
+            else:
+                # câmera indisponível: evita girar em falso
+                time.sleep(0.1)
+
+    def get_latest_frame(self):
+        """Retorna o frame mais recente (ou None se a câmera ainda não entregou nenhum)"""
+        with self._frame_lock:
+            return self.latest_frame
+
     def update_frame(self):
         if not self.running:
             return
 
-        try:
-            ret, frame = self.cap.read()
-        except Exception:
-            ret = False
-            frame = None
+        # Janela modal aberta: o preview está coberto, não gasta CPU redesenhando
+        if self._preview_paused:
+            self.root.after(200, self.update_frame)
+            return
 
-        if ret and frame is not None:
-            # Converte BGR -> RGB
-            try:
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            except Exception:
-                pass
+        # Só redesenha quando a câmera entregou um frame novo (evita resize/cópia de frames repetidos)
+        frame = None
+        if self._new_frame.is_set():
+            self._new_frame.clear()
+            frame = self.get_latest_frame()
 
+        if frame is not None:
             # Redimensionamento inteligente para não quebrar o layout
             cw = self.canvas.winfo_width()
             ch = self.canvas.winfo_height()
@@ -354,32 +725,60 @@ class KioskApp:
             if ch < 10: ch = 480
 
             try:
-                # Resize simples para preencher
-                frame = cv2.resize(frame, (cw, ch))
-                img = Image.fromarray(frame)
-                imgtk = ImageTk.PhotoImage(image=img)
-                self.canvas.imgtk = imgtk
-                self.canvas.configure(image=imgtk)
+                if self._preview_size != (cw, ch):
+                    self._alloc_preview_buffers(cw, ch)
+                # Resize simples para preencher, escrevendo direto no buffer reaproveitado
+                cv2.resize(frame, (cw, ch), dst=self._bgr_buf)
+                # BGR -> RGB na mesma cópia que preenche o PPM (view [:, :, ::-1], sem cv2.cvtColor)
+                np.copyto(self._ppm_pixels, self._bgr_buf[:, :, ::-1])
+                # o Tk decodifica PPM (P6) nativamente: sem Pillow no caminho do frame
+                self._tk_img.configure(data=self._ppm_buf.tobytes())
             except Exception as e:
                 pass
 
-        # Atualiza a cada 30ms
-        self.root.after(30, self.update_frame)
+        # Checagem curta (8ms): o ritmo real do preview é ditado pela câmera
+        self.root.after(8, self.update_frame)
+
+    def _alloc_preview_buffers(self, cw, ch):
+        """(Re)cria os buffers do preview para o tamanho atual do canvas"""
+        self._bgr_buf = np.empty((ch, cw, 3), np.uint8)
+        # buffer PPM completo: cabeçalho fixo + pixels RGB (_ppm_pixels é uma view dos pixels)
+        header = f"P6\n{cw} {ch}\n255\n".encode("ascii")
+        self._ppm_buf = np.empty(len(header) + ch * cw * 3, np.uint8)
+        self._ppm_buf[:len(header)] = np.frombuffer(header, np.uint8)
+        self._ppm_pixels = self._ppm_buf[len(header):].reshape(ch, cw, 3)
+        self._tk_img = tk.PhotoImage(width=cw, height=ch)
+        self.canvas.imgtk = self._tk_img
+        self.canvas.configure(image=self._tk_img)
+        self._preview_size = (cw, ch)
 
     # ================= LOGICA BIOMETRIA =================
     
     def finger_listen_loop(self):
         """Monitora o sensor biométrico em background"""
         print("[Biometria] Loop de escuta iniciado.")
+        retry = False
+        empty_probes = 0
+        poll_interval = FINGER_POLL_MIN
         while self.running:
             # Se não estiver pronto ou estiver cadastrando, espera
             if not self.biometrics_ready:
-                time.sleep(1)
+                self._wait_biometrics(1)
                 continue
 
             if self.is_enrolling_finger:
-                time.sleep(1)
+                # toques durante o cadastro não são acessos
+                self._drain_touch()
+                self._wait_biometrics(1)
                 continue
+
+            if self._finger_irq and not retry:
+                # dorme até o sensor sinalizar toque; no timeout lê o sensor mesmo assim
+                # (1 leitura/s), para a digital não parar se a IRQ nunca chegar
+                self._wait_biometrics(1.0, touch=True)
+                if not self.running:
+                    break
+            retry = False
             
             try:
                 # Checa se há dedo
@@ -388,186 +787,268 @@ class KioskApp:
                     user_found = get_user_by_finger(fid)
                     print(f"[Biometria] Acesso concedido: {user_found} (ID {fid})")
                     
-                    self.root.after(0, lambda: self.recognize_result.config(text=f"Digital: {user_found}", fg="#00FF00"))
+                    self._set_status(f"Digital: {user_found}", "#00FF00")
                     
                     # Abre locker
-                    threading.Thread(target=self.open_locker, daemon=True).start()
+                    self._lock_pool.submit(self.open_locker)
                     
                     # Delay para não abrir repetidamente
-                    time.sleep(3)
+                    self._wait_biometrics(3)
+                    self._drain_touch()
+                elif self._finger_irq:
+                    # dedo ainda no sensor (leitura falhou/imagem ruim): tenta de novo
+                    if GPIO.input(FINGER_IRQ_PIN):
+                        retry = True
+                        self._wait_biometrics(0.05)
                 else:
-                    time.sleep(0.1)
+                    # sensor ocioso: espaça o polling para poupar CPU e UART
+                    if self.finger_service.last_probe_empty:
+                        empty_probes += 1
+                        if empty_probes >= FINGER_BACKOFF_AFTER:
+                            empty_probes = 0
+                            poll_interval = min(poll_interval * 2, FINGER_POLL_MAX)
+                    else:
+                        empty_probes = 0
+                        poll_interval = FINGER_POLL_MIN
+                    self._wait_biometrics(poll_interval)
             except Exception as e:
                 print("Erro loop biometria:", e)
-                time.sleep(1)
+                self._wait_biometrics(1)
+
+    def _sync_sensor_with_db(self, service):
+        """
+        Reconcilia o banco com o sensor no boot: regrava os templates do host que faltam
+        no sensor (sensor trocado/apagado) e remove os mapeamentos sem cópia para regravar.
+        """
+        on_sensor = service.occupied_slots()
+        for finger_id, template in get_finger_templates().items():
+            if finger_id in on_sensor:
+                continue
+            if template is None:
+                print(f"[Biometria] ID {finger_id} não está no sensor e não tem cópia: removido do banco.")
+                delete_finger_map(finger_id)
+            elif service.restore_template(finger_id, template):
+                print(f"[Biometria] ID {finger_id} regravado no sensor a partir do banco.")
+            else:
+                # mantém a linha: a cópia continua disponível para a próxima tentativa
+                print(f"[Biometria] Falha ao regravar o ID {finger_id} no sensor.")
 
     def enroll_finger_ui(self):
         """Callback do botão de cadastro de digital"""
+        # um cadastro por vez: um segundo pegaria o mesmo slot livre e disputaria o sensor
+        if self.is_enrolling_finger:
+            return
         if not self.admin_authenticated:
-            messagebox.showwarning("Acesso negado", "Login admin necessário.")
+            self.toast("Login admin necessário.", color=TOAST_WARN)
             return
         
         if not self.biometrics_ready or not self.finger_service:
-            messagebox.showerror("Erro", "Biometria não inicializada ou sensor desconectado.")
+            self.toast("Biometria não inicializada ou sensor desconectado.", TOAST_ERROR_MS, TOAST_ERROR)
             return
 
         user_name = self.name_entry.get().strip()
         if not user_name:
-            messagebox.showwarning("Aviso", "Digite o nome do usuário antes de cadastrar a digital.")
+            self.toast("Digite o nome do usuário antes de cadastrar a digital.", color=TOAST_WARN)
+            return
+
+        # 1. Achar slot vazio (vem do cache de slots ocupados: não vai à UART)
+        fs = self.finger_service
+        slot = fs.find_empty_slot()
+        if slot is None:
+            self.toast("Memória do sensor cheia.", TOAST_ERROR_MS, TOAST_ERROR)
             return
 
         # Pausa a leitura para cadastrar
         self.is_enrolling_finger = True
-        
-        def worker():
-            try:
-                # 1. Achar slot vazio
-                slot = self.finger_service.find_empty_slot()
-                if slot is None:
-                    self.root.after(0, lambda: messagebox.showerror("Erro", "Memória do sensor cheia."))
-                    return
-
-                # Função interna para atualizar texto da UI vindo da thread
-                def update_status(msg):
-                    self.root.after(0, lambda: self.recognize_result.config(text=msg, fg="cyan"))
+        self.finger_btn.config(state="disabled")
+
+        def on_done(success):
+            # Libera o sensor para voltar a ler acessos
+            self.is_enrolling_finger = False
+            self.finger_btn.config(state="normal")
+            if success:
+                # Salva mapeamento ID -> Nome no banco
+                save_finger_map(slot, user_name, fs.last_template)
+                self.toast(f"Digital cadastrada para {user_name} (ID {slot})")
+                self._set_status(f"Digital OK: {user_name}", "white")
+            else:
+                self.toast("Erro ao cadastrar digital. Tente novamente.", TOAST_ERROR_MS, TOAST_ERROR)
+                self._set_status(*STATUS_ENROLL_ERROR)
+
+        # 2. Iniciar processo de cadastro: dirigido por after(), sem thread
+        self._enroll_enter(fs.WAIT_FIRST, slot)
+        self.root.after(0, self._enroll_step, fs.WAIT_FIRST, slot, on_done,
+                        time.monotonic() + fs.enroll_wait(fs.WAIT_FIRST)[1])
+
+    def _enroll_enter(self, state, location_id):
+        """Mostra a instrução do estado de cadastro (se houver)"""
+        prompt = self.finger_service.ENROLL_PROMPTS.get(state)
+        if prompt:
+            msg = prompt.format(location_id)
+            print(f"[Biometria] {msg}")
+            self._set_status(msg, "cyan")
+
+    def _enroll_step(self, state, location_id, callback, deadline):
+        """
+        Um passo do cadastro por tick do Tk: no máximo um comando ao sensor e reagenda o próximo.
+        `deadline` (time.monotonic) limita a espera atual; no fim chama callback(success).
+        """
+        fs = self.finger_service
+        try:
+            next_state = fs.enroll_step(state, location_id) if self.running else fs.FAILED
+        except Exception as e:
+            print("Erro no cadastro:", e)
+            next_state = fs.FAILED
 
-                # 2. Iniciar processo de cadastro
-                success = self.finger_service.enroll_finger(slot, callback_status=update_status)
-                
-                if success:
-                    # Salva mapeamento ID -> Nome no banco
-                    save_finger_map(slot, user_name)
-                    self.root.after(0, lambda: messagebox.showinfo("Sucesso", f"Digital cadastrada para {user_name} (ID {slot})"))
-                    self.root.after(0, lambda: self.recognize_result.config(text=f"Digital OK: {user_name}", fg="white"))
-                else:
-                    self.root.after(0, lambda: messagebox.showerror("Falha", "Erro ao cadastrar digital. Tente novamente."))
-                    self.root.after(0, lambda: self.recognize_result.config(text="Erro cadastro", fg="red"))
+        if next_state in (fs.DONE, fs.FAILED):
+            callback(next_state == fs.DONE)
+            return
 
-            except Exception as e:
-                print(e)
-            finally:
-                # Libera o sensor para voltar a ler acessos
-                self.is_enrolling_finger = False
+        wait = fs.enroll_wait(next_state)
+        if next_state != state:
+            self._enroll_enter(next_state, location_id)
+            if wait:
+                deadline = time.monotonic() + wait[1]
+        elif time.monotonic() >= deadline:
+            print("[Biometria] Tempo esgotado esperando o dedo.")
+            callback(False)
+            return
 
-        threading.Thread(target=worker, daemon=True).start()
+        # esperas leem o sensor no intervalo configurado; comandos seguem no próximo tick
+        delay_ms = int(wait[0] * 1000) if wait else 0
+        self.root.after(delay_ms, self._enroll_step, next_state, location_id, callback, deadline)
 
     # ================= LOGICA FACIAL (ORIGINAL) =================
 
     def capture_image(self):
         if not self.admin_authenticated:
-            messagebox.showwarning("Acesso negado", "Somente administradores podem capturar para cadastro. Faça login.")
+            self.toast("Somente administradores podem capturar para cadastro. Faça login.", color=TOAST_WARN)
             return
-        try:
-            ret, frame = self.cap.read()
-        except Exception as e:
-            ret = False
-            frame = None
-            print("Erro ao ler câmera:", e)
+        frame = self.get_latest_frame()
 
-        if not ret or frame is None:
-            messagebox.showerror("Erro", "Não foi possível acessar a câmera.")
+        if frame is None:
+            self.toast("Não foi possível acessar a câmera.", TOAST_ERROR_MS, TOAST_ERROR)
             return
-        _, buf = cv2.imencode('.jpg', frame)
-        img_bytes = buf.tobytes()
         # evita capturar mais do que o limite
-        if len(self.captured_images) >= CAPTURE_IMAGES_PER_USER:
-            messagebox.showinfo("Info", f"Você já capturou {CAPTURE_IMAGES_PER_USER} fotos. Pressione 'Enviar Cadastro' ou remova fotos manualmente.")
+        if self._capture_count >= CAPTURE_IMAGES_PER_USER:
+            self.toast(f"Você já capturou {CAPTURE_IMAGES_PER_USER} fotos. Pressione 'Enviar Cadastro' ou remova fotos manualmente.",
+                       color=TOAST_WARN)
+            return
+
+        # codifica o JPEG fora da thread do Tk; o armazenamento volta para o Tk via after()
+        # (a thread de captura sempre cria um array novo, então o frame não muda por baixo)
+        def worker():
+            try:
+                self._ui(self._store_capture, encode_jpeg(frame))
+            except Exception as e:
+                print("Erro ao codificar foto:", e)
+                self._ui(self.toast, "Falha ao capturar imagem.", TOAST_ERROR_MS, TOAST_ERROR)
+
+        self.pool.submit(worker)
+
+    def _store_capture(self, buf):
+        """Copia o JPEG codificado para o próximo slot do pool (roda na thread do Tk)"""
+        if self._capture_count >= CAPTURE_IMAGES_PER_USER:
             return
-        self.captured_images.append(img_bytes)
-        self.captures_label.config(text=f"Fotos capturadas: {len(self.captured_images)} / {CAPTURE_IMAGES_PER_USER}")
-        if len(self.captured_images) >= CAPTURE_IMAGES_PER_USER:
-            messagebox.showinfo("Info", f"{CAPTURE_IMAGES_PER_USER} fotos capturadas. Pressione 'Enviar Cadastro'.")
+        # atribuição in-place: o bytearray reaproveita a memória já alocada quando cabe
+        self._capture_pool[self._capture_count][:] = buf
+        self._capture_count += 1
+        self.captures_label.config(text=f"Fotos capturadas: {self._capture_count} / {CAPTURE_IMAGES_PER_USER}")
+        if self._capture_count >= CAPTURE_IMAGES_PER_USER:
+            self.toast(f"{CAPTURE_IMAGES_PER_USER} fotos capturadas. Pressione 'Enviar Cadastro'.")
+
+    def _reset_captures(self):
+        """Descarta as fotos do cadastro (os buffers do pool são mantidos)"""
+        self._capture_count = 0
+        self.captures_label.config(text=f"Fotos capturadas: 0 / {CAPTURE_IMAGES_PER_USER}")
 
     def send_registration(self):
         if not self.admin_authenticated:
-            messagebox.showwarning("Acesso negado", "Somente administradores podem enviar cadastros. Faça login.")
+            self.toast("Somente administradores podem enviar cadastros. Faça login.", color=TOAST_WARN)
             return
         user_name = self.name_entry.get().strip()
         if user_name == "":
-            messagebox.showwarning("Aviso", "Digite o nome do usuário.")
+            self.toast("Digite o nome do usuário.", color=TOAST_WARN)
             return
-        if len(self.captured_images) == 0:
-            messagebox.showwarning("Aviso", "Nenhuma foto capturada.")
+        if self._capture_count == 0:
+            self.toast("Nenhuma foto capturada.", color=TOAST_WARN)
             return
 
         def worker():
             try:
-                headers = {"Authorization": f"Bearer {ADMIN_TOKEN}"}
-                success = True
-                for i, img_bytes in enumerate(self.captured_images, start=1):
-                    url = f"{API_URL}/add-user/{user_name}"
-                    files = {"file": (f"img{i}.jpg", img_bytes, "image/jpeg")}
-                    try:
-                        resp = requests.post(url, files=files, headers=headers, timeout=20)
-                    except Exception as e:
-                        success = False
-                        print(f"[ADD-USER] Erro ao enviar foto {i} para {url}: {e}")
-                        messagebox.showerror("Erro", f"Falha ao enviar foto {i}: {e}")
-                        break
+                success = False
+                url = f"{API_URL}/add-user/{user_name}"
+                # todas as fotos em um único POST multipart (várias partes 'file')
+                files = [("file", (f"img{i}.jpg", img_bytes, "image/jpeg"))
+                         for i, img_bytes in enumerate(self._capture_pool[:self._capture_count], start=1)]
+                try:
+                    resp = self.http.post(url, files=files, timeout=60)
+                except Exception as e:
+                    resp = None
+                    print(f"[ADD-USER] Erro ao enviar fotos para {url}: {e}")
+                    self._ui(self.toast, f"Falha ao enviar fotos: {e}", TOAST_ERROR_MS, TOAST_ERROR)
 
-                    print(f"[ADD-USER] foto {i} status: {resp.status_code} | resp: {resp.text}")
+                if resp is not None:
+                    print(f"[ADD-USER] {len(files)} fotos status: {resp.status_code} | resp: {resp.text}")
 
                     if resp.status_code in (200, 201):
-                        continue
+                        success = True
                     elif resp.status_code == 401:
-                        success = False
-                        messagebox.showerror("Não autorizado", "Token inválido ou ausente ao enviar cadastro.")
-                        break
+                        self._ui(self.toast, "Token inválido ou ausente ao enviar cadastro.", TOAST_ERROR_MS, TOAST_ERROR)
                     else:
-                        success = False
                         try:
                             msg = resp.json()
                         except Exception:
                             msg = resp.text
-                        messagebox.showerror("Erro", f"Falha ao enviar foto {i}: {resp.status_code} - {msg}")
-                        break
+                        self._ui(self.toast, f"Falha ao enviar fotos: {resp.status_code} - {msg}", TOAST_ERROR_MS, TOAST_ERROR)
 
                 if success:
                     # opcional: auto-treinar após upload
                     if AUTO_TRAIN_AFTER_UPLOAD:
                         try:
-                            t_resp = requests.post(f"{API_URL}/train", headers=headers, timeout=120)
+                            t_resp = self.http.post(f"{API_URL}/train", timeout=120)
                             print(f"[AUTO-TRAIN] status: {t_resp.status_code} | {t_resp.text}")
                             if t_resp.status_code in (200,):
-                                messagebox.showinfo("Sucesso", f"Envio concluído para '{user_name}'. Treinamento iniciado.")
+                                self._ui(self.toast, f"Envio concluído para '{user_name}'. Treinamento iniciado.")
                             elif t_resp.status_code == 401:
-                                messagebox.showwarning("Treino", "Envio OK, mas treino não autorizado (token).")
+                                self._ui(self.toast, "Envio OK, mas treino não autorizado (token).", TOAST_MS, TOAST_WARN)
                             else:
-                                messagebox.showwarning("Treino", f"Envio OK, resposta treino inesperada: {t_resp.status_code}")
+                                self._ui(self.toast, f"Envio OK, resposta treino inesperada: {t_resp.status_code}", TOAST_MS, TOAST_WARN)
                         except Exception as e:
                             print("[AUTO-TRAIN] erro:", e)
-                            messagebox.showwarning("Treino", f"Envio OK, mas falha ao iniciar treino: {e}")
+                            self._ui(self.toast, f"Envio OK, mas falha ao iniciar treino: {e}", TOAST_MS, TOAST_WARN)
                     else:
-                        messagebox.showinfo("Sucesso", f"Envio concluído para '{user_name}'.")
-                    self.captured_images.clear()
-                    self.captures_label.config(text=f"Fotos capturadas: 0 / {CAPTURE_IMAGES_PER_USER}")
+                        self._ui(self.toast, f"Envio concluído para '{user_name}'.")
+                    self._ui(self._reset_captures)
             except Exception as e:
                 traceback.print_exc()
-                messagebox.showerror("Erro", f"Falha no envio: {e}")
+                self._ui(self.toast, f"Falha no envio: {e}", TOAST_ERROR_MS, TOAST_ERROR)
 
-        threading.Thread(target=worker, daemon=True).start()
+        self.pool.submit(worker)
 
     def recognize_once(self):
-        ret, frame = self.cap.read()
-        if not ret:
-            messagebox.showerror("Erro", "Falha ao capturar imagem.")
+        frame = self.get_latest_frame()
+        if frame is None:
+            self.toast("Falha ao capturar imagem.", TOAST_ERROR_MS, TOAST_ERROR)
             return
-        _, buf = cv2.imencode('.jpg', frame)
-        img_bytes = buf.tobytes()
 
         def worker():
             try:
+                scale = RECOGNIZE_WIDTH / frame.shape[1]
+                small = frame if scale >= 1 else cv2.resize(frame, None, fx=scale, fy=scale,
+                                                            interpolation=cv2.INTER_AREA)
+                img_bytes = encode_jpeg(small, _RECOGNIZE_JPEG_PARAMS)
                 url = f"{API_URL}/recognize"
                 files = {"file": ("image.jpg", img_bytes, "image/jpeg")}
                 
-                self.root.after(0, lambda: self.recognize_result.config(text="Analisando...", fg="yellow"))
+                self._set_status(*STATUS_ANALYZING)
 
                 try:
-                    resp = requests.post(url, files=files, timeout=15)
+                    resp = self.http.post(url, files=files, timeout=15)
                 except Exception as e:
                     print("[RECOGNIZE] Erro na requisição:", e)
-                    self.root.after(0, lambda: self.recognize_result.config(text="Erro de Conexão", fg="red"))
-                    messagebox.showerror("Erro", f"Erro no reconhecimento (conexão): {e}")
+                    self._set_status(*STATUS_CONN_ERROR)
+                    self._ui(self.toast, f"Erro no reconhecimento (conexão): {e}", TOAST_ERROR_MS, TOAST_ERROR)
                     return
 
                 status = resp.status_code
@@ -581,65 +1062,64 @@ class KioskApp:
 
                 if status != 200:
                     if status == 401:
-                        self.root.after(0, lambda: self.recognize_result.config(text="Não Autorizado", fg="red"))
-                        messagebox.showerror("Erro", "Reconhecimento não autorizado (token/API).")
+                        self._set_status(*STATUS_UNAUTHORIZED)
+                        self._ui(self.toast, "Reconhecimento não autorizado (token/API).", TOAST_ERROR_MS, TOAST_ERROR)
                     else:
-                        self.root.after(0, lambda: self.recognize_result.config(text="Erro Servidor", fg="red"))
-                        messagebox.showerror("Erro", f"Resposta inesperada do servidor: {status}\n{text}")
+                        self._set_status(*STATUS_SERVER_ERROR)
+                        self._ui(self.toast, f"Resposta inesperada do servidor: {status}\n{text}", TOAST_ERROR_MS, TOAST_ERROR)
                     return
 
                 if not data:
-                    self.root.after(0, lambda: self.recognize_result.config(text="Erro Dados", fg="red"))
-                    messagebox.showerror("Erro", "Resposta do servidor inválida.")
+                    self._set_status(*STATUS_DATA_ERROR)
+                    self._ui(self.toast, "Resposta do servidor inválida.", TOAST_ERROR_MS, TOAST_ERROR)
                     return
 
                 if data.get("found"):
                     user = data.get("user", "Desconhecido")
                     conf = data.get("confidence", 0)
-                    self.root.after(0, lambda: self.recognize_result.config(text=f"Face: {user} ({conf:.1f})", fg="#00FF00"))
+                    self._set_status(f"Face: {user} ({conf:.1f})", "#00FF00")
                     
                     # abrir locker (thread-safe)
-                    threading.Thread(target=self.open_locker, daemon=True).start()
+                    self._lock_pool.submit(self.open_locker)
                 else:
                     reason = data.get("reason", "")
                     if reason:
-                        self.root.after(0, lambda: self.recognize_result.config(text=f"Não reconhecido: {reason}", fg="red"))
+                        self._set_status(f"Não reconhecido: {reason}", "red")
                     else:
-                        self.root.after(0, lambda: self.recognize_result.config(text="Não reconhecido", fg="red"))
+                        self._set_status(*STATUS_NOT_RECOGNIZED)
             except Exception as e:
                 traceback.print_exc()
-                self.root.after(0, lambda: self.recognize_result.config(text="Erro Fatal", fg="red"))
-                messagebox.showerror("Erro", f"Erro no reconhecimento: {e}")
+                self._set_status(*STATUS_FATAL)
+                self._ui(self.toast, f"Erro no reconhecimento: {e}", TOAST_ERROR_MS, TOAST_ERROR)
 
-        threading.Thread(target=worker, daemon=True).start()
+        self.pool.submit(worker)
 
     def train_models(self):
         def worker():
             try:
                 url = f"{API_URL}/train"
-                headers = {"Authorization": f"Bearer {ADMIN_TOKEN}"}
                 try:
-                    resp = requests.post(url, headers=headers, timeout=120)
+                    resp = self.http.post(url, timeout=120)
                 except Exception as e:
                     print("[TRAIN] Erro na requisição:", e)
-                    messagebox.showerror("Erro", f"Falha ao chamar /train: {e}")
+                    self._ui(self.toast, f"Falha ao chamar /train: {e}", TOAST_ERROR_MS, TOAST_ERROR)
                     return
                 print(f"[TRAIN] status: {resp.status_code} | resp: {resp.text}")
                 if resp.status_code == 200:
                     try:
                         j = resp.json()
-                        messagebox.showinfo("Treino", "Treinamento concluído (verifique logs da API).")
+                        self._ui(self.toast, "Treinamento concluído (verifique logs da API).")
                     except Exception:
-                        messagebox.showinfo("Treino", "Treinamento concluído.")
+                        self._ui(self.toast, "Treinamento concluído.")
                 elif resp.status_code == 401:
-                    messagebox.showerror("Não autorizado", "Token inválido ou ausente na API!")
+                    self._ui(self.toast, "Token inválido ou ausente na API!", TOAST_ERROR_MS, TOAST_ERROR)
                 else:
-                    messagebox.showwarning("Treino", f"Resposta inesperada: {resp.status_code}\n{resp.text}")
+                    self._ui(self.toast, f"Resposta inesperada: {resp.status_code}\n{resp.text}", TOAST_MS, TOAST_WARN)
             except Exception as e:
                 traceback.print_exc()
-                messagebox.showerror("Erro", f"Falha ao chamar /train: {e}")
+                self._ui(self.toast, f"Falha ao chamar /train: {e}", TOAST_ERROR_MS, TOAST_ERROR)
 
-        threading.Thread(target=worker, daemon=True).start()
+        self.pool.submit(worker)
 
     def open_locker_manual(self):
         if not self.admin_authenticated:
@@ -648,7 +1128,7 @@ class KioskApp:
             self.admin_login_popup()
             return
         if messagebox.askyesno("Confirmar", "Deseja abrir o locker manualmente?"):
-            threading.Thread(target=self.open_locker, daemon=True).start()
+            self._lock_pool.submit(self.open_locker)
 
     def open_locker(self):
         if GPIO_AVAILABLE:
@@ -658,7 +1138,7 @@ class KioskApp:
                 time.sleep(2)
                 GPIO.output(SOLENOID_PIN, GPIO.LOW)
             except Exception as e:
-                messagebox.showerror("Erro GPIO", f"Falha ao acionar GPIO: {e}")
+                self._ui(self.toast, f"Falha ao acionar GPIO: {e}", TOAST_ERROR_MS, TOAST_ERROR)
         else:
             print(">> LOCKER ABERTO (Simulação) <<")
             time.sleep(2)
@@ -666,97 +1146,360 @@ class KioskApp:
     def quit_app(self):
         if messagebox.askyesno("Sair", "Deseja realmente sair?"):
             self.running = False
+            # acorda o loop da biometria imediatamente
+            os.write(self._shutdown_w, b"q")
+            # some da tela na hora; câmera/GPIO/serial são liberados em background.
+            # Teclado e toast são Toplevels topmost fora da root: o withdraw não os esconde
+            self.hide_keyboard()
+            if self._toast is not None:
+                self._toast.destroy()
+                self._toast = None
+            self.root.withdraw()
+            threading.Thread(target=self._teardown, daemon=True).start()
+
+    def _teardown(self):
+        """Libera câmera, serial e GPIO em paralelo e então fecha o Tk"""
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self._auth_pool.shutdown(wait=False, cancel_futures=True)
+        self._lock_pool.shutdown(wait=False, cancel_futures=True)
+
+        def release_camera():
+            # espera a thread de captura sair do cap.read() antes de liberar o V4L2
+            self._capture_thread.join(timeout=1)
+            self.cap.release()
+
+        tasks = [release_camera]
+        if self.finger_service:
+            tasks.append(self.finger_service.close)
+        if GPIO_AVAILABLE:
+            tasks.append(GPIO.cleanup)
+
+        def run(task):
             try:
-                self.cap.release()
-            except:
-                pass
-            if GPIO_AVAILABLE:
-                try:
-                    GPIO.cleanup()
-                except:
-                    pass
-            hide_keyboard()
-            self.root.destroy()
-            sys.exit()
+                task()
+            except Exception as e:
+                print("Erro ao encerrar:", e)
+
+        workers = [threading.Thread(target=run, args=(t,), daemon=True) for t in tasks]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join(timeout=3)
+        self.root.after(0, self.root.destroy)
+
+    # ---------------- Janelas modais (criadas uma vez, reaproveitadas) ----------------
+    def _show_modal(self, win):
+        """Mostra uma janela modal pré-construída e suspende o preview enquanto ela estiver aberta"""
+        if win.state() != "withdrawn":
+            win.lift()
+            return
+        # o preview fica coberto: não gasta CPU redesenhando
+        self._preview_paused += 1
+        # teclado aberto fora deste grab engoliria os toques: fecha antes (reabre no <FocusIn>)
+        self.hide_keyboard()
+        win.deiconify()
+        win.lift()
+        win.grab_set()
+
+    def _hide_modal(self, win):
+        """Esconde a janela (withdraw em vez de destroy) e retoma o preview"""
+        if win.state() == "withdrawn":
+            return
+        self.hide_keyboard()
+        win.grab_release()
+        win.withdraw()
+        self._preview_paused -= 1
+
+    # ---------------- Teclado virtual ----------------
+    def _build_keyboard(self):
+        """Constrói o teclado uma única vez (fica escondido até show_keyboard)"""
+        kbd = tk.Toplevel(self.root)
+        kbd.withdraw()
+        # sem borda/WM: tocar numa tecla não tira o foco da Entry de destino
+        kbd.overrideredirect(True)
+        kbd.attributes("-topmost", True)
+        kbd.configure(bg="#111")
+
+        self._kbd_target = None
+        self._kbd_grab_owner = None
+        self._kbd_upper = False
+        self._kbd_layer = "abc"
+        # caracteres das teclas por índice; _kbd_press(i) escolhe a camada na hora
+        self._kbd_layers = {name: "".join(rows) for name, rows in KBD_LAYERS.items()}
+        self._kbd_chars = self._kbd_layers["abc"]
+        self._kbd_keys = []
+        key_style = dict(font=self.font_btn, bg="#333", fg="white", width=3, height=1, takefocus=0)
+
+        i = 0
+        for row in KBD_ROWS:
+            frame = tk.Frame(kbd, bg="#111")
+            frame.pack(pady=2)
+            for ch in row:
+                btn = tk.Button(frame, text=ch, command=partial(self._kbd_press, i), **key_style)
+                btn.pack(side=tk.LEFT, padx=2)
+                self._kbd_keys.append(btn)
+                i += 1
+
+        frame = tk.Frame(kbd, bg="#111")
+        frame.pack(pady=(2,6))
+        special = dict(key_style, width=6)
+        tk.Button(frame, text="⇧", command=self._kbd_shift, **special).pack(side=tk.LEFT, padx=2)
+        for name in KBD_LAYERS:
+            if name != "abc":
+                tk.Button(frame, text=name, command=partial(self._kbd_set_layer, name),
+                          **dict(special, width=4)).pack(side=tk.LEFT, padx=2)
+        tk.Button(frame, text="espaço", command=partial(self._kbd_insert, " "),
+                  **dict(special, width=14)).pack(side=tk.LEFT, padx=2)
+        tk.Button(frame, text="⌫", command=self._kbd_backspace, **special).pack(side=tk.LEFT, padx=2)
+        tk.Button(frame, text="OK", command=self.hide_keyboard, **dict(special, bg="#007ACC")).pack(side=tk.LEFT, padx=2)
+
+        # posição fixa: rodapé da tela (calculada uma vez)
+        kbd.update_idletasks()
+        x = (kbd.winfo_screenwidth() - kbd.winfo_reqwidth()) // 2
+        y = kbd.winfo_screenheight() - kbd.winfo_reqheight()
+        kbd.geometry(f"+{x}+{y}")
+        return kbd
+
+    def _kbd_focus(self, event):
+        """
+        <FocusIn>/toque nas Entry: abre o teclado apontado para o campo.
+        O toque cobre o campo que já tem foco (após OK não há novo FocusIn).
+        """
+        self.show_keyboard(event.widget)
+
+    def show_keyboard(self, entry):
+        self._kbd_target = entry
+        if self._kbd.state() == "withdrawn":
+            self._kbd.deiconify()
+            self._kbd.lift()
+        # com uma janela modal aberta, o grab dela bloquearia os toques no teclado:
+        # o teclado assume o grab e o devolve em hide_keyboard. Conferido também com o
+        # teclado já visível (o grab pode ter mudado de dono desde que ele abriu).
+        grab = self.root.grab_current()
+        if grab is not None and str(grab) != str(self._kbd):
+            self._kbd_grab_owner = grab
+            self._kbd.grab_set()
+
+    def hide_keyboard(self):
+        if self._kbd.state() == "withdrawn":
+            return
+        self._kbd.withdraw()
+        owner, self._kbd_grab_owner = self._kbd_grab_owner, None
+        if owner is not None and owner.winfo_exists() and owner.state() != "withdrawn":
+            owner.grab_set()
+        else:
+            self._kbd.grab_release()
+
+    def _kbd_press(self, i):
+        ch = self._kbd_chars[i]
+        self._kbd_insert(ch.upper() if self._kbd_upper else ch)
+
+    def _kbd_insert(self, text):
+        if self._kbd_target is not None:
+            self._kbd_target.insert(tk.INSERT, text)
+
+    def _kbd_backspace(self):
+        target = self._kbd_target
+        if target is None:
+            return
+        pos = target.index(tk.INSERT)
+        if pos > 0:
+            target.delete(pos - 1)
+
+    def _kbd_shift(self):
+        self._kbd_upper = not self._kbd_upper
+        self._kbd_relabel()
+
+    def _kbd_set_layer(self, name):
+        """Alterna para a camada `name`; tocar de novo volta às letras"""
+        self._kbd_layer = "abc" if self._kbd_layer == name else name
+        self._kbd_chars = self._kbd_layers[self._kbd_layer]
+        self._kbd_relabel()
+
+    def _kbd_relabel(self):
+        chars = self._kbd_chars.upper() if self._kbd_upper else self._kbd_chars
+        for btn, ch in zip(self._kbd_keys, chars):
+            btn.config(text=ch)
 
     # ---------------- Admin login popup ----------------
-    def admin_login_popup(self):
+    def _build_login_window(self):
+        """Constrói a janela de login uma única vez (fica escondida até admin_login_popup)"""
         login_win = tk.Toplevel(self.root)
+        login_win.withdraw()
         login_win.title("Login do Administrador")
         login_win.geometry("420x360")
         login_win.configure(bg="#222")
         login_win.transient(self.root)
-        login_win.grab_set()
+        login_win.protocol("WM_DELETE_WINDOW", self._cancel_login)
 
-        tk.Label(login_win, text="Login Admin", font=("Helvetica", 20, "bold"), bg="#222", fg="white").pack(pady=10)
+        tk.Label(login_win, text="Login Admin", font=self.font_heading, bg="#222", fg="white").pack(pady=10)
 
         tk.Label(login_win, text="Usuário:", bg="#222", fg="white").pack(pady=(6,0))
-        username_entry = tk.Entry(login_win, font=("Helvetica", 14))
-        username_entry.pack(ipadx=8, ipady=6, pady=(0,8))
-        username_entry.bind("<FocusIn>", lambda e: show_keyboard())
-        username_entry.bind("<FocusOut>", lambda e: hide_keyboard())
+        self._login_user_entry = ttk.Entry(login_win, font=self.font_btn, style="Kiosk.TEntry")
+        self._login_user_entry.pack(ipadx=8, ipady=6, pady=(0,8))
+        self._login_user_entry.bind("<FocusIn>", self._kbd_focus)
+        self._login_user_entry.bind("<ButtonRelease-1>", self._kbd_focus)
 
         tk.Label(login_win, text="Senha:", bg="#222", fg="white").pack(pady=(4,0))
-        password_entry = tk.Entry(login_win, font=("Helvetica", 14), show="*")
-        password_entry.pack(ipadx=8, ipady=6, pady=(0,8))
-        password_entry.bind("<FocusIn>", lambda e: show_keyboard())
-        password_entry.bind("<FocusOut>", lambda e: hide_keyboard())
-
-        def try_login():
-            user = username_entry.get().strip()
-            pw = password_entry.get().strip()
-            if user == "" or pw == "":
-                messagebox.showwarning("Aviso", "Preencha usuário e senha.")
-                return
-            ok = check_admin_login(user, pw)
-            if ok:
-                hide_keyboard()
-                self.admin_authenticated = True
-                self.admin_user = user
-                self.admin_status.config(text=f"Admin: {user}", fg="lightgreen")
-                login_win.destroy()
-                messagebox.showinfo("Bem-vindo", f"Autenticado como {user}")
-            else:
-                messagebox.showerror("Erro", "Usuário ou senha inválidos.")
+        self._login_pw_entry = ttk.Entry(login_win, font=self.font_btn, show="*", style="Kiosk.TEntry")
+        self._login_pw_entry.pack(ipadx=8, ipady=6, pady=(0,8))
+        self._login_pw_entry.bind("<FocusIn>", self._kbd_focus)
+        self._login_pw_entry.bind("<ButtonRelease-1>", self._kbd_focus)
 
-        btn_frame = tk.Frame(login_win, bg="#222")
+        btn_frame = ttk.Frame(login_win, style="Kiosk.TFrame")
         btn_frame.pack(pady=10)
 
-        tk.Button(btn_frame, text="Entrar", font=("Helvetica", 14), bg="#007ACC", fg="white",
-                  width=12, height=2, command=try_login).grid(row=0, column=0, padx=6)
-        tk.Button(btn_frame, text="Cancelar", font=("Helvetica", 14), bg="#888", fg="white",
-                  width=12, height=2, command=lambda: (hide_keyboard(), login_win.destroy())).grid(row=0, column=1, padx=6)
-
-        # Opção para alterar senha (apenas se autenticado, aqui mostramos para admin atual)
-        def change_pw_popup():
-            if not self.admin_authenticated:
-                messagebox.showwarning("Aviso", "Autentique-se primeiro para alterar senha.")
-                return
-            cp = tk.Toplevel(self.root)
-            cp.title("Alterar Senha Admin")
-            cp.geometry("420x240")
-            cp.transient(self.root)
-            cp.grab_set()
-            tk.Label(cp, text="Nova senha:", bg="#222", fg="white").pack(pady=(12,4))
-            new_pw_entry = tk.Entry(cp, font=("Helvetica", 14), show="*")
-            new_pw_entry.pack(ipadx=8, ipady=6, pady=(0,8))
-            new_pw_entry.bind("<FocusIn>", lambda e: show_keyboard())
-            new_pw_entry.bind("<FocusOut>", lambda e: hide_keyboard())
-
-            def do_change():
-                new_pw = new_pw_entry.get().strip()
-                if new_pw == "":
-                    messagebox.showwarning("Aviso", "Senha inválida.")
-                    return
-                change_admin_password(self.admin_user, new_pw)
-                hide_keyboard()
-                cp.destroy()
-                messagebox.showinfo("Sucesso", "Senha alterada.")
+        self._login_btn = ttk.Button(btn_frame, text="Entrar", style="Kiosk.TButton",
+                                     command=self._try_login, width=12)
+        self._login_btn.grid(row=0, column=0, padx=6)
+        self._login_cancel_btn = ttk.Button(btn_frame, text="Cancelar", style="Cancel.Kiosk.TButton",
+                                            command=self._cancel_login, width=12)
+        self._login_cancel_btn.grid(row=0, column=1, padx=6)
 
-            tk.Button(cp, text="Alterar", font=("Helvetica", 12), command=do_change).pack(pady=8)
+        # indicador enquanto o bcrypt roda (o texto fica vazio fora da verificação)
+        self._login_status = tk.Label(login_win, text="", font=self.font_small, bg="#222", fg="#cccccc")
+        self._login_status.pack()
 
         # botão para alterar senha será habilitado só após login; deixamos ele visível
-        tk.Button(login_win, text="Alterar senha (após login)", command=change_pw_popup).pack(pady=(6,0))
+        ttk.Button(login_win, text="Alterar senha (após login)", style="Small.Kiosk.TButton",
+                   command=self.change_pw_popup).pack(pady=(6,0))
+
+        self._login_win = login_win
+
+    def admin_login_popup(self):
+        self._login_user_entry.delete(0, tk.END)
+        self._login_pw_entry.delete(0, tk.END)
+        self._login_btn.config(state="normal")
+        self._login_cancel_btn.config(state="normal")
+        self._login_status.config(text="")
+        self._show_modal(self._login_win)
+
+    def _try_login(self):
+        user = self._login_user_entry.get().strip()
+        pw = self._login_pw_entry.get().strip()
+        if user == "" or pw == "":
+            self.toast("Preencha usuário e senha.", color=TOAST_WARN)
+            return
+
+        # bcrypt é lento de propósito: verifica fora da thread do Tk e devolve o resultado via after().
+        # Entrar e Cancelar ficam desabilitados até a resposta: evita enfileirar várias verificações
+        # e um login cancelado que, ao terminar, ainda abriria a sessão admin.
+        self._login_pending = True
+        self._login_btn.config(state="disabled")
+        self._login_cancel_btn.config(state="disabled")
+        self._login_status.config(text="Verificando...")
+        future = self._auth_pool.submit(self._verify_login, user, pw)
+        future.add_done_callback(lambda f: self._ui(self._finish_login, user, f))
+
+    @staticmethod
+    def _verify_login(user, pw):
+        """Roda no _auth_pool: retorna (ok, must_reset)"""
+        ok = check_admin_login(user, pw)
+        return ok, ok and admin_must_reset(user)
+
+    def _cancel_login(self):
+        # fechar durante a verificação não cancela o bcrypt: espera o resultado
+        if not self._login_pending:
+            self._hide_modal(self._login_win)
+
+    def _finish_login(self, user, future):
+        self._login_pending = False
+        self._login_btn.config(state="normal")
+        self._login_cancel_btn.config(state="normal")
+        self._login_status.config(text="")
+        if self._login_win.state() == "withdrawn":
+            # janela fechada antes da resposta: o login foi abandonado, não abre sessão
+            return
+        try:
+            ok, must_reset = future.result()
+        except Exception as e:
+            print("Erro no login:", e)
+            ok = must_reset = False
+        if ok:
+            self.admin_user = user
+            self._hide_modal(self._login_win)
+            if must_reset:
+                # senha padrão: a sessão não é autenticada até a nova senha ser gravada
+                self._pending_reset = True
+                self.admin_authenticated = False
+                self.admin_status.config(text="Admin: Não autenticado", fg="red")
+                self.toast("Senha padrão em uso. Defina uma nova senha.", color=TOAST_WARN)
+                self.change_pw_popup()
+            else:
+                self._set_admin_session(user)
+                self.toast(f"Autenticado como {user}")
+        else:
+            self.toast("Usuário ou senha inválidos.", TOAST_ERROR_MS, TOAST_ERROR)
+
+    def _set_admin_session(self, user):
+        self.admin_authenticated = True
+        self.admin_user = user
+        self.admin_status.config(text=f"Admin: {user}", fg="lightgreen")
+
+    # Opção para alterar senha (apenas se autenticado, aqui mostramos para admin atual)
+    def _build_change_pw_window(self):
+        """Constrói a janela de troca de senha uma única vez"""
+        cp = tk.Toplevel(self.root)
+        cp.withdraw()
+        cp.title("Alterar Senha Admin")
+        cp.geometry("420x240")
+        cp.transient(self.root)
+        cp.protocol("WM_DELETE_WINDOW", self._cancel_change_pw)
+        tk.Label(cp, text="Nova senha:", bg="#222", fg="white").pack(pady=(12,4))
+        self._new_pw_entry = ttk.Entry(cp, font=self.font_btn, show="*", style="Kiosk.TEntry")
+        self._new_pw_entry.pack(ipadx=8, ipady=6, pady=(0,8))
+        self._new_pw_entry.bind("<FocusIn>", self._kbd_focus)
+        self._new_pw_entry.bind("<ButtonRelease-1>", self._kbd_focus)
+
+        ttk.Button(cp, text="Alterar", style="Small.Kiosk.TButton", command=self._do_change_pw).pack(pady=8)
+
+        self._change_pw_win = cp
+
+    def change_pw_popup(self):
+        if not (self.admin_authenticated or self._pending_reset):
+            self.toast("Autentique-se primeiro para alterar senha.", color=TOAST_WARN)
+            return
+        self._new_pw_entry.delete(0, tk.END)
+        self._show_modal(self._change_pw_win)
+
+    def _do_change_pw(self):
+        new_pw = self._new_pw_entry.get().strip()
+        if new_pw == "":
+            self.toast("Senha inválida.", color=TOAST_WARN)
+            return
+        user = self.admin_user
+
+        # bcrypt.hashpw é lento de propósito: gera o hash no pool e volta ao Tk via _ui
+        def worker():
+            try:
+                change_admin_password(user, new_pw)
+                error = None
+            except Exception as e:
+                error = e
+            self._ui(self._finish_change_pw, error)
+
+        self.pool.submit(worker)
+
+    def _finish_change_pw(self, error):
+        if error is not None:
+            self.toast(f"Falha ao alterar senha: {error}", TOAST_ERROR_MS, TOAST_ERROR)
+            return
+        self._hide_modal(self._change_pw_win)
+        if self._pending_reset:
+            # troca obrigatória concluída: só agora a sessão admin passa a valer
+            self._pending_reset = False
+            self._set_admin_session(self.admin_user)
+            self.toast(f"Senha alterada. Autenticado como {self.admin_user}")
+        else:
+            self.toast("Senha alterada.")
+
+    def _cancel_change_pw(self):
+        """Fechar a janela sem trocar a senha padrão cancela o login"""
+        self._hide_modal(self._change_pw_win)
+        if self._pending_reset:
+            self._pending_reset = False
+            self.admin_user = None
+            self.toast("Login cancelado: a troca da senha padrão é obrigatória.", color=TOAST_WARN)
 
 
 # ----------------- Execução -----------------
@@ -764,6 +1507,11 @@ def main():
     root = tk.Tk()
     app = KioskApp(root, fullscreen=False)
     root.mainloop()
+    # As threads dos ThreadPoolExecutor não são daemon: o hook de saída do interpretador
+    # esperaria uma tarefa em andamento (/train até 120s, /add-user até 60s, pulso do solenoide).
+    # Câmera, serial e GPIO já foram liberados no _teardown, então sai na hora.
+    sys.stdout.flush()
+    os._exit(0)
 
 
 if __name__ == "__main__":
@@ -1,83 +1,211 @@
 # finger_service.py
-import time
-import serial
-import adafruit_fingerprint
+import threading
 
 class FingerprintService:
-    def __init__(self, port="/dev/serial0", baudrate=57600):
+    def __init__(self, port="/dev/serial0", baudrate=57600, timeout=0.5,
+                 poll_interval=0.05, enroll_timeout=30, low_latency=True,
+                 remove_poll_interval=0.1, remove_timeout=10):
+        # poll_interval: pausa entre leituras enquanto o cadastro espera o dedo (evita girar a CPU/UART a 100%)
+        # enroll_timeout: tempo máximo (s) de cada espera do cadastro antes de desistir
+        # (aplicados por quem dirige enroll_step, via enroll_wait)
+        # remove_*: o mesmo para a fase "remova o dedo" (tirar o dedo leva 200-500ms,
+        # então 10 leituras/s bastam)
+        self.poll_interval = poll_interval
+        self.enroll_timeout = enroll_timeout
+        self.remove_poll_interval = remove_poll_interval
+        self.remove_timeout = remove_timeout
         self.sensor = None
+        self.uart = None
+        # A UART é half-duplex comando/resposta: só uma operação por vez.
+        # O loop de escuta roda numa thread e o cadastro na thread do Tk no kiosk.
+        self._lock = threading.RLock()
+        # IDs ocupados no sensor (None = ainda não lido); evita varrer os 127 slots a cada cadastro
+        self._occupied = None
+        # template (bytes) do último cadastro bem-sucedido, para cópia no banco do host
+        self.last_template = None
+        # True quando a última check_finger() não viu dedo (NOFINGER): permite backoff no polling
+        self.last_probe_empty = True
         self.available = False
+        # módulo adafruit_fingerprint (importado só aqui: máquinas de dev/CI sem o sensor
+        # nem carregam pyserial e a biblioteca)
+        self._af = None
         try:
+            import serial
+            import adafruit_fingerprint
+            self._af = adafruit_fingerprint
+            # códigos de retorno usados nos laços de leitura, sem lookup no módulo a cada volta
+            self._OK = adafruit_fingerprint.OK
+            self._NOFINGER = adafruit_fingerprint.NOFINGER
             # Configura a conexão serial UART
-            uart = serial.Serial(port, baudrate=baudrate, timeout=1)
-            self.sensor = adafruit_fingerprint.Adafruit_Fingerprint(uart)
-            self.available = self.sensor.check_module()
+            # A biblioteca lê cada pacote pelo tamanho exato, então read() retorna assim que
+            # o pacote chega; o timeout só limita quanto esperamos por um pacote perdido.
+            self.uart = serial.Serial(port, baudrate=baudrate, timeout=timeout)
+            if low_latency:
+                self._enable_low_latency()
+            self.sensor = adafruit_fingerprint.Adafruit_Fingerprint(self.uart)
+            # Uma só troca na UART: a leitura da tabela de índices já confirma que o sensor
+            # responde, preenche o cache de slots ocupados e dá a contagem de templates
+            self.available = self.sensor.read_templates() == self._OK
             if self.available:
-                print(f"[Biometria] Sensor encontrado! Templates salvos: {self.sensor.count}")
+                self._occupied = set(self.sensor.templates)
+                print(f"[Biometria] Sensor encontrado! Templates salvos: {len(self._occupied)}")
             else:
                 print("[Biometria] Sensor não respondeu.")
+        except ImportError as e:
+            print(f"[Biometria] Biblioteca do sensor ausente: {e}")
+            self.available = False
         except Exception as e:
             print(f"[Biometria] Erro ao inicializar: {e}")
             self.available = False
 
+    def _enable_low_latency(self):
+        """
+        Liga ASYNC_LOW_LATENCY na tty (equivale a 'setserial <porta> low_latency'):
+        o kernel entrega os bytes recebidos na hora, sem esperar o tick da work-queue,
+        o que corta boa parte dos ~20ms de cada comando/resposta do sensor.
+        """
+        try:
+            # pyserial faz o TIOCGSERIAL/TIOCSSERIAL (só existe no Linux; falha vira ValueError)
+            self.uart.set_low_latency_mode(True)
+        except (AttributeError, ValueError, OSError) as e:
+            # nem toda UART/driver aceita (ex.: alguns drivers de UART embutida)
+            print(f"[Biometria] low_latency indisponível: {e}")
+
+    def occupied_slots(self):
+        """IDs com template gravado no sensor (cópia do cache)"""
+        if not self.available: return set()
+        with self._lock:
+            self._ensure_occupied_cache()
+            return set(self._occupied)
+
     def find_empty_slot(self):
         """Busca o próximo ID livre (0-127)"""
         if not self.available: return None
+        with self._lock:
+            return self._find_empty_slot()
+
+    def _find_empty_slot(self):
         # O sensor R307 geralmente suporta ids de 1 a 127 (ou mais dependendo do modelo)
-        # Vamos tentar achar um buraco livre
-        # A biblioteca não tem um 'get_free_id' nativo eficiente, então iteramos ou confiamos no count
-        # Para simplificar, vamos tentar do 1 ao 127
-        for i in range(1, 128):
-            if self.sensor.load_model(i) != adafruit_fingerprint.OK:
-                # Se falhar ao carregar, provavelmente está vazio
-                return i
-        return None
+        self._ensure_occupied_cache()
+        return next((i for i in range(1, 128) if i not in self._occupied), None)
 
-    def enroll_finger(self, location_id):
+    def _ensure_occupied_cache(self):
         """
-        Realiza o processo de cadastro completo.
-        Retorna True se sucesso, False caso contrário.
-        Este método é 'blocante', ideal rodar em thread.
+        Carrega os IDs ocupados na primeira chamada e mantém em memória
+        (atualizado por enroll_finger/delete_finger).
         """
-        if not self.available: return False
+        if self._occupied is not None:
+            return
+        # read_templates() traz a tabela de índices inteira em poucas transações UART
+        if self.sensor.read_templates() == self._OK:
+            self._occupied = set(self.sensor.templates)
+            return
+        # Sem a tabela: sonda slot a slot (load_model falha nos slots vazios)
+        self._occupied = {i for i in range(1, 128)
+                          if self.sensor.load_model(i) == self._OK}
 
-        print(f"[Biometria] Coloque o dedo para cadastrar na posição {location_id}...")
-        
-        # 1. Primeira captura
-        while self.sensor.get_image() != adafruit_fingerprint.OK:
-            pass # Esperando dedo
-        
-        print("[Biometria] Imagem 1 capturada.")
-        if self.sensor.image_2_tz(1) != adafruit_fingerprint.OK:
-            return False
+    # Estados do cadastro (enroll_step). Cada passo faz no máximo um comando ao sensor,
+    # então quem dirige o cadastro (ex.: root.after no kiosk) não precisa de thread.
+    WAIT_FIRST = "WAIT_FIRST"
+    CONV1 = "CONV1"
+    WAIT_REMOVE = "WAIT_REMOVE"
+    WAIT_SECOND = "WAIT_SECOND"
+    CONV2 = "CONV2"
+    MODEL = "MODEL"
+    STORE = "STORE"
+    DONE = "DONE"
+    FAILED = "FAILED"
 
-        print("[Biometria] Remova o dedo...")
-        time.sleep(1)
-        while self.sensor.get_image() != adafruit_fingerprint.NOFINGER:
-            pass
+    # instruções exibidas ao usuário ao entrar em cada espera
+    ENROLL_PROMPTS = {
+        WAIT_FIRST: "Coloque o dedo para cadastrar na posição {}...",
+        WAIT_REMOVE: "Remova o dedo...",
+        WAIT_SECOND: "Coloque o MESMO dedo novamente...",
+    }
 
-        print("[Biometria] Coloque o MESMO dedo novamente...")
-        
-        # 2. Segunda captura (confirmação)
-        while self.sensor.get_image() != adafruit_fingerprint.OK:
-            pass
+    def enroll_wait(self, state):
+        """
+        (intervalo, timeout) em segundos dos estados de espera do dedo;
+        None nos estados de comando (podem seguir imediatamente).
+        """
+        if state == self.WAIT_REMOVE:
+            return self.remove_poll_interval, self.remove_timeout
+        if state in (self.WAIT_FIRST, self.WAIT_SECOND):
+            return self.poll_interval, self.enroll_timeout
+        return None
 
-        print("[Biometria] Imagem 2 capturada.")
-        if self.sensor.image_2_tz(2) != adafruit_fingerprint.OK:
-            return False
+    def enroll_step(self, state, location_id):
+        """
+        Executa um passo do cadastro e retorna o próximo estado.
+        Nas esperas, retorna o mesmo estado enquanto o dedo não chega/sai (o timeout é de quem chama).
+        Termina em DONE ou FAILED; em DONE o template fica em last_template.
+        """
+        if not self.available: return self.FAILED
+        with self._lock:
+            return self._enroll_step(state, location_id)
+
+    def _enroll_step(self, state, location_id):
+        sensor, OK = self.sensor, self._OK
+
+        # 1. Primeira captura / 2. segunda captura (confirmação)
+        if state == self.WAIT_FIRST:
+            return self.CONV1 if sensor.get_image() == OK else state
+        if state == self.WAIT_SECOND:
+            return self.CONV2 if sensor.get_image() == OK else state
+        if state == self.WAIT_REMOVE:
+            return self.WAIT_SECOND if sensor.get_image() == self._NOFINGER else state
+
+        if state == self.CONV1:
+            print("[Biometria] Imagem 1 capturada.")
+            return self.WAIT_REMOVE if sensor.image_2_tz(1) == OK else self.FAILED
+        if state == self.CONV2:
+            print("[Biometria] Imagem 2 capturada.")
+            return self.MODEL if sensor.image_2_tz(2) == OK else self.FAILED
 
         # 3. Cria o modelo
-        if self.sensor.create_model() != adafruit_fingerprint.OK:
-            print("[Biometria] As digitais não coincidem.")
-            return False
-        
+        if state == self.MODEL:
+            if sensor.create_model() != OK:
+                print("[Biometria] As digitais não coincidem.")
+                return self.FAILED
+            # Copia o template para o host: permite regravar (restore_template) num sensor
+            # novo ou trocar o subconjunto ativo quando houver mais usuários que slots
+            self.last_template = self._download_template()
+            return self.STORE
+
         # 4. Salva no slot
-        if self.sensor.store_model(location_id) != adafruit_fingerprint.OK:
-            print("[Biometria] Erro ao salvar na memória flash.")
-            return False
+        if state == self.STORE:
+            if sensor.store_model(location_id) != OK:
+                print("[Biometria] Erro ao salvar na memória flash.")
+                return self.FAILED
+            if self._occupied is not None:
+                self._occupied.add(location_id)
+            print(f"[Biometria] Sucesso! Salvo no ID {location_id}")
+            return self.DONE
 
-        print(f"[Biometria] Sucesso! Salvo no ID {location_id}")
-        return True
+        return self.FAILED
+
+    def _download_template(self):
+        """Lê o modelo do char buffer 1 (~512 bytes). Falha aqui não invalida o cadastro."""
+        try:
+            return bytes(self.sensor.get_fpdata("char", 1))
+        except Exception as e:
+            print(f"[Biometria] Não foi possível copiar o template: {e}")
+            return None
+
+    def restore_template(self, location_id, template):
+        """Grava no slot `location_id` um template salvo no host (bytes de get_fpdata)."""
+        if not self.available: return False
+        with self._lock:
+            try:
+                self.sensor.send_fpdata(list(template), "char", 1)
+            except Exception as e:
+                print(f"[Biometria] Falha ao enviar template para o ID {location_id}: {e}")
+                return False
+            if self.sensor.store_model(location_id) != self._OK:
+                return False
+            if self._occupied is not None:
+                self._occupied.add(location_id)
+            return True
 
     def check_finger(self):
         """
@@ -85,21 +213,40 @@ class FingerprintService:
         Retorna o ID (int) se achou, ou None.
         """
         if not self.available: return None
+        with self._lock:
+            return self._check_finger()
 
+    def _check_finger(self):
+        # chamado a cada poucos ms pelo loop de escuta: atributos em locais
+        sensor, OK = self.sensor, self._OK
         # Tenta ler a imagem
-        if self.sensor.get_image() != adafruit_fingerprint.OK:
+        result = sensor.get_image()
+        self.last_probe_empty = result == self._NOFINGER
+        if result != OK:
             return None
         
         # Converte para template
-        if self.sensor.image_2_tz(1) != adafruit_fingerprint.OK:
+        if sensor.image_2_tz(1) != OK:
             return None
         
         # Busca no banco de dados interno do sensor
-        if self.sensor.finger_search() != adafruit_fingerprint.OK:
+        if sensor.finger_search() != OK:
             return None
         
-        return self.sensor.finger_id
+        return sensor.finger_id
 
     def delete_finger(self, location_id):
         if not self.available: return False
-        return self.sensor.delete_model(location_id) == adafruit_fingerprint.OK
\ No newline at end of file
+        with self._lock:
+            if self.sensor.delete_model(location_id) != self._OK:
+                return False
+            if self._occupied is not None:
+                self._occupied.discard(location_id)
+            return True
+
+    def close(self):
+        """Fecha a porta serial"""
+        self.available = False
+        # sem o lock de propósito: fechar a porta destrava uma operação em andamento
+        if self.uart is not None:
+            self.uart.close()